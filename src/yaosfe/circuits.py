@@ -65,6 +65,31 @@ class LogicCircuit(Circuit):
     
     def evaluate(self, input_bits: list[int]) -> list[int]:
         return super().evaluate(input_bits)
+
+    def evaluate_batch(self, input_batch: list[list[int]]) -> list[list[int]]:
+        """Evaluate many inputs at once, each wire holds one bit per input as python int"""
+
+        if not all([ len(bits) == len(self.input_ids) for bits in input_batch ]):
+            raise ValueError("Lengths of input_ids and input values do not match")
+
+        mask = (1 << len(input_batch)) - 1
+        wire_word: list[int] = [ None ] * self.n
+
+        for pos, i in enumerate(self.input_ids):
+            wire_word[i] = sum(bits[pos] << k for k, bits in enumerate(input_batch))
+
+        # Inputs of the gate always have smaller ids, so they are already calculated
+        for i in range(self.n):
+            if wire_word[i] is not None:
+                continue
+
+            gate: LogicGate = self.gate_by_idx[i]
+            wire_word[i] = gate.evaluate_batch([ wire_word[j] for j in gate.inputs ], mask)
+
+        return [
+            [ (wire_word[i] >> k) & 1 for i in self.output_ids ]
+            for k in range(len(input_batch))
+        ]
     
     def as_dict(self) -> dict:
         return {
@@ -1,9 +1,11 @@
 import argparse
+import asyncio
 from pathlib import Path
 
 from yaosfe.gates import GarbledGate
 from yaosfe.circuits import GarbledCircuit, LogicCircuit
 from yaosfe.garbler import Garbler
+from yaosfe.server import EvaluatorServer
 from yaosfe.util import bits_to_str
 
 def print_error(message: str):
@@ -29,6 +31,7 @@ def run_garbler(args):
     input_str = args.input_bits
     verify_output = args.verify
     output_path = args.output
+    row_reduction = args.row_reduction
 
     # Load LogicCircuit
     try:
@@ -41,7 +44,7 @@ def run_garbler(args):
     if len(input_bits) != len(lc.input_ids):
         print_error_and_exit("Length of input_bits and circuit input_ids do not match")
 
-    garbler = Garbler()
+    garbler = Garbler(row_reduction=row_reduction)
     gc = garbler.garble(lc, input_bits)
     gc.store_in_file(output_path)
     print_info(f"Garbled circuit stored under: {output_path}")
@@ -80,6 +83,31 @@ def run_evaluator(args):
     print(f"Outputs evaluated for ids: {gc.output_ids} (in order)")
     print('\n'.join(outputs))
 
+def run_server(args):
+    print_run("Evaluator Server")
+
+    server = EvaluatorServer(
+        Path(args.socket),
+        workers=args.workers,
+        max_pending=args.max_pending,
+        max_session_bytes=args.max_session_bytes,
+        read_timeout=args.read_timeout,
+        backlog=args.backlog,
+    )
+
+    async def serve():
+        async with server:
+            print_info(f"Listening on: {args.socket}")
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    stats = server.stats()
+    latency = ', '.join(f"{p}={ms:.2f}ms" for p, ms in stats["latency_ms"].items())
+    print_info(f"Sessions: {stats['sessions']}, evaluated: {stats['evaluated']}, errors: {stats['errors']}, latency: {latency or '-'}")
 
 def main():
     parser = argparse.ArgumentParser()
@@ -91,12 +119,22 @@ def main():
     parser_garbler.add_argument("input_bits")
     parser_garbler.add_argument("-o", "--output", default="gc_out.json")
     parser_garbler.add_argument("-v", "--verify", action="store_true", default=False)
+    parser_garbler.add_argument("-r", "--row-reduction", action="store_true", default=False)
     parser_garbler.set_defaults(func=run_garbler)
 
     parser_evaluate = subparsers.add_parser("evaluator", help="Evaluate a given circuit")
     parser_evaluate.add_argument("garbled_circuit")
     parser_evaluate.set_defaults(func=run_evaluator)
 
+    parser_server = subparsers.add_parser("server", help="Run long-running evaluator on a unix socket")
+    parser_server.add_argument("socket")
+    parser_server.add_argument("-w", "--workers", type=int, default=None)
+    parser_server.add_argument("-p", "--max-pending", type=int, default=8)
+    parser_server.add_argument("-m", "--max-session-bytes", type=int, default=64 * 1024 * 1024)
+    parser_server.add_argument("-t", "--read-timeout", type=float, default=30.0)
+    parser_server.add_argument("-b", "--backlog", type=int, default=1024)
+    parser_server.set_defaults(func=run_server)
+
     args = parser.parse_args()
     args.func(args)
 
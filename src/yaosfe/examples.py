@@ -1,9 +1,20 @@
+import random
+
 from yaosfe.circuits import LogicCircuit
 from yaosfe.gates import LogicGate
 
 G_XOR = [0, 1, 1, 0]
 G_AND = [0, 0, 0, 1]
 G_OR  = [0, 1, 1, 1]
+G_NOT = [1, 0]
+
+# Gate mix used for random circuits: (number of inputs, truth table) by gate name
+GATE_TABLES = {
+    "AND": (2, G_AND),
+    "OR": (2, G_OR),
+    "XOR": (2, G_XOR),
+    "NOT": (1, G_NOT),
+}
 
 # 1-bit Adder: (A0, B0) => (C1, C0)
 LC_ADD_1BIT = LogicCircuit(
@@ -73,4 +84,36 @@ LC_AVG_3BIT = LogicCircuit(
         LogicGate(16, [13, 15], G_OR), # 16  = OR(13, 15)
         LogicGate(17, [11, 14], G_XOR), # 17 = XOR(11, 14)
     ]
-)
\ No newline at end of file
+)
+
+def random_logic_circuit(n_inputs: int, n_gates: int, n_outputs: int, gate_mix: dict[str, float] = None, seed = None) -> LogicCircuit:
+    """Generate random DAG circuit, gate_mix maps GATE_TABLES names to relative weights"""
+
+    if n_inputs < 1 or n_gates < 1:
+        raise ValueError("Random circuit needs at least one input and one gate")
+
+    if not 1 <= n_outputs <= n_inputs + n_gates:
+        raise ValueError("Number of outputs must be in range of all used ids")
+
+    gate_mix = gate_mix or { name: 1 for name in GATE_TABLES }
+
+    unknown = [ name for name in gate_mix if name not in GATE_TABLES ]
+    if unknown:
+        raise ValueError(f"Unknown gate names in gate_mix ({', '.join(unknown)}), expected: {', '.join(GATE_TABLES)}")
+
+    names = list(gate_mix)
+    weights = [ gate_mix[name] for name in names ]
+
+    rng = random.Random(seed)
+
+    gates = []
+    for idx in range(n_inputs, n_inputs + n_gates):
+        n_gate_inputs, table = GATE_TABLES[rng.choices(names, weights)[0]]
+        # Each gate may use any of the previous wires, which keeps the graph acyclic
+        inputs = [ rng.randrange(idx) for _ in range(n_gate_inputs) ]
+        gates.append(LogicGate(idx, inputs, table))
+
+    # Prefer the last wires as outputs, these are the deepest ones
+    output_ids = list(range(n_inputs + n_gates - n_outputs, n_inputs + n_gates))
+
+    return LogicCircuit(list(range(n_inputs)), output_ids, gates)
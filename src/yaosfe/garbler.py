@@ -6,8 +6,9 @@ from yaosfe.gates import LogicGate, GarbledGate
 
 class Garbler:
 
-    def __init__(self, seed = None):
+    def __init__(self, seed = None, row_reduction: bool = False):
         self.random = random.Random(seed)
+        self.row_reduction = row_reduction
 
     def garble(self, lc: LogicCircuit, input_bits: list[int]) -> GarbledCircuit:
 
@@ -22,7 +23,9 @@ class Garbler:
             for _ in range(lc.n)
         ]
 
-        garbled_gates = [ self._garble_gate(g) for g in lc.gates ]
+        # Gates are garbled in order of ids (inputs always have smaller ids), so the
+        # output keys replaced by the row reduction are known to the following gates
+        garbled_gates = [ self._garble_gate(g) for g in sorted(lc.gates, key=lambda g: g.id) ]
 
         input_keys = [ self.keys[idx][value] for idx, value in zip (lc.input_ids, input_bits) ]
 
@@ -54,35 +57,53 @@ class Garbler:
 
         return output_bits
 
-    def _garble_gate(self, gate: LogicGate) -> GarbledGate:
+    def _row_key(self, gate: LogicGate, in_bits: int) -> bytes:
+        """AES key for the row of the truth table given by in_bits"""
 
-        garbled_values = []
+        # Logic "NOT" Gate
+        if len(gate.inputs) == 1:
+            # Get the key corresponding to the "in_bits" value on the input
+            key_single = self.keys[gate.inputs[0]][in_bits] 
 
-        for in_bits, out_val in enumerate(gate.values):
+            # Double use of the same key does not increase the security, but makes it 
+            # consistent with the 2-input logic gates
+            return key_single + key_single
 
-            key_out = self.keys[gate.id][out_val]
+        # Logic Binary Gate (AND, OR, XOR, ...)
+        assert len(gate.inputs) == 2
 
-            # Logic "NOT" Gate
-            if len(gate.inputs) == 1:
-                # Get the key corresponding to the "in_bits" value on the input
-                key_single = self.keys[gate.inputs[0]][in_bits] 
+        # Split input bits into individual bit values (left, right)
+        bit_left = (in_bits & 2) >> 1
+        bit_right = in_bits & 1
 
-                # Double use of the same key does not increase the security, but makes it 
-                # consistent with the 2-input logic gates
-                key_in = key_single + key_single
+        key_left = self.keys[gate.inputs[0]][bit_left]
+        key_right = self.keys[gate.inputs[1]][bit_right]
 
-            # Logic Binary Gate (AND, OR, XOR, ...)
-            else:
-                assert len(gate.inputs) == 2
+        return key_left + key_right
+
+    def _garble_gate(self, gate: LogicGate) -> GarbledGate:
 
-                # Split input bits into individual bit values (left, right)
-                bit_left = (in_bits & 2) >> 1
-                bit_right = in_bits & 1
+        rows = list(enumerate(gate.values))
 
-                key_left = self.keys[gate.inputs[0]][bit_left]
-                key_right = self.keys[gate.inputs[1]][bit_right]
+        if self.row_reduction:
+            # Row reduction (GRR3): pick the row which is not transmitted and derive
+            # its output key from the row AES key, the evaluator recomputes it
+            # when none of the transmitted rows decrypts correctly
+            in_bits, out_val = rows.pop(self.random.randrange(len(rows)))
 
-                key_in = key_left + key_right
+            aes = AES.new(self._row_key(gate, in_bits), AES.MODE_ECB)
+            derived_key = aes.encrypt(GarbledGate.GRR_TWEAK)
+
+            keys = list(self.keys[gate.id])
+            keys[out_val] = derived_key
+            self.keys[gate.id] = tuple(keys)
+
+        garbled_values = []
+
+        for in_bits, out_val in rows:
+
+            key_out = self.keys[gate.id][out_val]
+            key_in = self._row_key(gate, in_bits)
 
             aes = AES.new(key_in, AES.MODE_ECB)
             ciphertext = aes.encrypt(key_out + GarbledGate.PAD_ZEROS)
@@ -95,7 +116,8 @@ class Garbler:
         gg = GarbledGate(
             gate.id,
             gate.inputs,
-            garbled_values
+            garbled_values,
+            self.row_reduction
         )
 
         return gg
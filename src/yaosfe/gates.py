@@ -14,13 +14,18 @@ class Gate:
         if max(self.inputs) >= self.id:
             raise ValueError("Gate can only contain inputs with smaller ids")
 
-        if len(self.values) != 2 ** len(self.inputs):
-            raise ValueError("Number of gate values must be equal to power of 2 of possible inputs")
+        if len(self.values) != self.table_size:
+            raise ValueError(f"Number of gate values must be equal to the table size ({self.table_size})")
 
     @property
     def id(self) -> int:
         return self._id
 
+    @property
+    def table_size(self) -> int:
+        """Number of values, by default power of 2 of possible inputs"""
+        return 2 ** len(self.inputs)
+
     def evaluate(self, input_values: list):
         raise NotImplementedError
 
@@ -46,6 +51,26 @@ class LogicGate(Gate):
 
         return self.values[truth_table_idx]
 
+    def evaluate_batch(self, input_words: list[int], mask: int) -> int:
+        """Bit-sliced evaluation: bit k of each word is the input value for k-th evaluation"""
+
+        if len(input_words) != len(self.inputs):
+            raise ValueError("Lengths of inputs and input words do not match")
+
+        # Sum of products over the truth table rows evaluating to 1
+        result = 0
+        for row, value in enumerate(self.values):
+            if not value:
+                continue
+
+            term = mask
+            for pos, word in enumerate(input_words):
+                bit = (row >> (len(input_words) - 1 - pos)) & 1
+                term &= word if bit else ~word & mask
+            result |= term
+
+        return result
+
     def __repr__(self) -> str:
         header = f"{self.__class__.__name__}({self.id})"
         inputs = f"<{','.join(str(x) for x in self.inputs)}>"
@@ -68,8 +93,12 @@ class GarbledGate(Gate):
     # Garbling Parameters
     KEY_SIZE = 16
     PAD_ZEROS = b"\x00" * KEY_SIZE
+    # Row reduction (GRR3): output key of the omitted row is AES(k1||k2, GRR_TWEAK)
+    GRR_TWEAK = b"\xff" * KEY_SIZE
 
-    def __init__(self, id: int, inputs: list[int], values: list[bytes]):
+    def __init__(self, id: int, inputs: list[int], values: list[bytes], row_reduction: bool = False):
+        # Must be set before the base class validates the table size
+        self.row_reduction = row_reduction
         super().__init__(id, inputs, values)
 
         if not all([isinstance(value, bytes) for value in values]):
@@ -84,18 +113,24 @@ class GarbledGate(Gate):
         dec_key = input_keys[0] * 2 if len(input_keys) == 1 else b"".join(input_keys)
         aes = AES.new(dec_key, AES.MODE_ECB)
 
-        # Four values corresponding to AES(k1||k2, k3||PAD) ciphertexts
-        output_key = None
+        # Four (or three if row-reduced) values corresponding to AES(k1||k2, k3||PAD) ciphertexts
         for ciphertext in self.values:
             plaintext = aes.decrypt(ciphertext)
 
             # Correct decryption will end with 0x00 * 16
             if plaintext.endswith(self.PAD_ZEROS):
-                output_key = plaintext[:self.KEY_SIZE]
-        else:
-            ValueError("Cannot find valid plaintext from AES decryption")
+                return plaintext[:self.KEY_SIZE]
+
+        # No transmitted row matches - the keys correspond to the omitted row
+        if self.row_reduction:
+            return aes.encrypt(self.GRR_TWEAK)
 
-        return output_key
+        raise ValueError("Cannot find valid plaintext from AES decryption")
+
+    @property
+    def table_size(self) -> int:
+        size = super().table_size
+        return size - 1 if self.row_reduction else size
 
     def __repr__(self) -> str:
         header = f"{self.__class__.__name__}({self.id})"
@@ -107,7 +142,8 @@ class GarbledGate(Gate):
         return {
             "id": self.id,
             "inputs": self.inputs,
-            "values": [ b.hex() for b in self.values ]
+            "values": [ b.hex() for b in self.values ],
+            "row_reduction": self.row_reduction
         }
 
     @classmethod
@@ -115,5 +151,6 @@ class GarbledGate(Gate):
         return cls(
             payload["id"],
             payload["inputs"],
-            [ bytes.fromhex(x) for x in payload["values"] ]
+            [ bytes.fromhex(x) for x in payload["values"] ],
+            payload.get("row_reduction", False)
         )
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from yaosfe.circuits import GarbledCircuit
+
+# Every message is sent as 1-byte message type and 4-byte big-endian length
+# followed by utf-8 JSON payload, replies repeat the type of the request
+HEADER = struct.Struct(">BI")
+
+# Message types
+EVALUATE = 1
+STATS = 2
+
+def evaluate_payload(data: bytes) -> dict:
+    """Parse and evaluate serialized GarbledCircuit, runs inside the worker process"""
+
+    # Any failure is reported to the session only, a malformed
+    # circuit must not bring down the whole daemon
+    try:
+        gc = GarbledCircuit.from_dict(json.loads(data))
+        output_keys = gc.evaluate()
+    except Exception as e:
+        return { "error": f"Invalid garbled circuit: {e!r}" }
+
+    return {
+        "output_ids": gc.output_ids,
+        "output_keys": [ key.hex() for key in output_keys ],
+    }
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of the already sorted values (p in range 0..100)"""
+
+    if not ordered:
+        raise ValueError("Cannot calculate percentile of empty values")
+
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, dict]:
+    kind, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, json.loads(await reader.readexactly(size))
+
+async def write_message(writer: asyncio.StreamWriter, kind: int, message: dict = None):
+    # Messages without payload (e.g. STATS) are sent with empty body
+    data = json.dumps(message).encode() if message is not None else b""
+    writer.write(HEADER.pack(kind, len(data)) + data)
+    await writer.drain()
+
+async def request(socket_path: Path, kind: int, payload: dict = None) -> dict:
+    """Send single message to the running EvaluatorServer and wait for the reply"""
+
+    reader, writer = await asyncio.open_unix_connection(str(socket_path))
+    try:
+        await write_message(writer, kind, payload)
+        _, reply = await read_message(reader)
+        return reply
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+class EvaluatorServer:
+    """Long-running evaluator accepting many GarbledCircuits over a unix socket
+
+    Each connection is a session which may send any number of messages:
+        EVALUATE with serialized GarbledCircuit -> {"output_ids": [...], "output_keys": [...]}
+        STATS with empty body -> {"sessions": n, "evaluated": n, "errors": n, "latency_ms": {"p50": ..., ...}}
+
+    Parsing and AES decryption of the circuits is offloaded to the process pool.
+    At most `max_pending` circuits are buffered and evaluated at once - remaining
+    sessions wait before their message body is read, which propagates the
+    backpressure to the clients. STATS messages do not wait for a free slot,
+    they must not carry any body. Session sending STATS with a body or a message
+    of unknown type is closed without reading the body.
+    """
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(
+        self,
+        socket_path: Path,
+        workers: int = None,
+        max_pending: int = 8,
+        max_session_bytes: int = 64 * 1024 * 1024,
+        read_timeout: float = 30.0,
+        latency_window: int = 10000,
+        backlog: int = 1024,
+    ):
+        if max_pending < 1:
+            raise ValueError("Server must allow at least one pending evaluation")
+
+        self.socket_path = Path(socket_path)
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_session_bytes = max_session_bytes
+        self.read_timeout = read_timeout
+        # Clients connecting over the listen backlog fail instead of waiting
+        self.backlog = backlog
+
+        self.sessions = 0
+        self.evaluated = 0
+        self.errors = 0
+        # Only the most recent latencies are kept for the percentiles
+        self.latencies: deque[float] = deque(maxlen=latency_window)
+
+        self._executor = None
+        self._server = None
+        self._pending = None
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._server = await asyncio.start_unix_server(self._handle_session, path=str(self.socket_path), backlog=self.backlog)
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        if self._executor is not None:
+            # Waiting for the workers to exit would block the event loop
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+
+        self.socket_path.unlink(missing_ok=True)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def stats(self) -> dict:
+        latency_ms = {}
+        if self.latencies:
+            ordered = sorted(self.latencies)
+            latency_ms = {
+                f"p{p}": percentile(ordered, p) * 1000
+                for p in self.PERCENTILES
+            }
+
+        return {
+            "sessions": self.sessions,
+            "evaluated": self.evaluated,
+            "errors": self.errors,
+            "latency_ms": latency_ms,
+        }
+
+    async def _handle_session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    kind, size = HEADER.unpack(await reader.readexactly(HEADER.size))
+                except asyncio.IncompleteReadError:
+                    break
+
+                if size > self.max_session_bytes:
+                    # Message body is not consumed, the session cannot continue
+                    error = f"Message size exceeds session limit ({size} > {self.max_session_bytes} bytes)"
+                    await write_message(writer, kind, { "error": error })
+                    break
+
+                if kind == EVALUATE:
+                    reply = await self._handle_evaluate(reader, size)
+                elif kind == STATS and size == 0:
+                    reply = self.stats()
+                else:
+                    # Body is never buffered outside of the evaluation slots,
+                    # it is not consumed and the session cannot continue
+                    if kind == STATS:
+                        error = f"STATS message must have empty body ({size} bytes given)"
+                    else:
+                        error = f"Unknown message type ({kind})"
+                    await write_message(writer, kind, { "error": error })
+                    break
+
+                await write_message(writer, kind, reply)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            # Client disconnected or stalled in the middle of the message
+            pass
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    async def _handle_evaluate(self, reader: asyncio.StreamReader, size: int) -> dict:
+        start = time.perf_counter()
+
+        # Body is read only after acquiring a free evaluation slot, so at most
+        # max_pending raw bodies (of max_session_bytes each) are held by the
+        # server, they are parsed only inside the worker processes
+        async with self._pending:
+            data = await asyncio.wait_for(reader.readexactly(size), self.read_timeout)
+
+            executor, future = self._submit(data)
+            try:
+                reply = await future
+            except BrokenProcessPool:
+                # Worker died while the job was running, it may be the cause
+                # so it is not retried
+                self._restart_executor(executor)
+                reply = { "error": "Worker process terminated during evaluation" }
+
+        # Only successful evaluations are included in the latency percentiles
+        if "error" in reply:
+            self.errors += 1
+        else:
+            self.evaluated += 1
+            self.latencies.append(time.perf_counter() - start)
+
+        return reply
+
+    def _submit(self, data: bytes) -> tuple[ProcessPoolExecutor, asyncio.Future]:
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return executor, loop.run_in_executor(executor, evaluate_payload, data)
+        except BrokenProcessPool:
+            # Pool was broken before the job was submitted, so the job never
+            # ran - submit it once more to the fresh pool
+            self._restart_executor(executor)
+            executor = self._executor
+            return executor, loop.run_in_executor(executor, evaluate_payload, data)
+
+    def _restart_executor(self, broken: ProcessPoolExecutor):
+        # Many sessions may observe the same broken pool, replace it only once
+        if self._executor is not broken:
+            return
+
+        broken.shutdown(wait=False)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
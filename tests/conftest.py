@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from yaosfe.circuits import GarbledCircuit
+from yaosfe.server import EvaluatorServer, EVALUATE, STATS
+from yaosfe.server import request as send_request
+
+
+@pytest.fixture
+def evaluate_on_server(request, tmp_path):
+    """Evaluate circuits concurrently on EvaluatorServer, one client session per circuit
+
+    The returned function gives the replies (in order of circuits), the server
+    stats fetched before shutdown and the closed server object. For unittest
+    classes (see `pytest.mark.usefixtures`) it is also set as instance attribute.
+    """
+
+    def run(circuits: list[GarbledCircuit], **server_kwargs) -> tuple[list[dict], dict, EvaluatorServer]:
+        socket_path = tmp_path / "evaluator.sock"
+
+        async def scenario():
+            async with EvaluatorServer(socket_path, **server_kwargs) as server:
+                replies = await asyncio.gather(*[
+                    send_request(socket_path, EVALUATE, gc.as_dict())
+                    for gc in circuits
+                ])
+                stats = await send_request(socket_path, STATS)
+            return replies, stats, server
+
+        return asyncio.run(scenario())
+
+    if request.instance is not None:
+        request.instance.evaluate_on_server = run
+
+    return run
@@ -1,15 +1,24 @@
+import asyncio
+import json
+import os
+import tempfile
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
 from unittest import TestCase
 
+import pytest
+
 from yaosfe.garbler import Garbler
-from yaosfe.circuits import LogicCircuit
+from yaosfe.circuits import LogicCircuit, GarbledCircuit
 from yaosfe.gates import LogicGate
 from yaosfe.examples import LC_ADD_1BIT, LC_ADD_2BIT, LC_ADD_3BIT, LC_AVG_3BIT
+from yaosfe.server import EvaluatorServer, HEADER, EVALUATE, STATS, read_message, request, percentile
 from yaosfe.util import gen_nbit_inputs
 
 class TestLogicGates(TestCase):
 
-    def run_binary_gate_test(self, truth_table: list[int]):
-        garbler = Garbler(seed=42)
+    def run_binary_gate_test(self, truth_table: list[int], row_reduction: bool = False):
+        garbler = Garbler(seed=42, row_reduction=row_reduction)
 
         # Method suited only for binary gates
         self.assertEqual(len(truth_table), 4)
@@ -30,8 +39,8 @@ class TestLogicGates(TestCase):
             output_bits = garbler.decrypt(gc.output_ids, output_keys)
             self.assertEqual(output_bits[0], truth_table[i])
         
-    def run_unitary_gate_test(self, truth_table: list[int]):
-        garbler = Garbler(seed=42)
+    def run_unitary_gate_test(self, truth_table: list[int], row_reduction: bool = False):
+        garbler = Garbler(seed=42, row_reduction=row_reduction)
 
         # Method suited only for unit 1-bit gates
         self.assertEqual(len(truth_table), 2)
@@ -67,11 +76,18 @@ class TestLogicGates(TestCase):
     def test_gate_XOR(self):
         self.run_binary_gate_test([0, 1, 1, 0])
 
+    def test_row_reduction_gates(self):
+        for truth_table in [[1, 0], [0, 1]]:
+            self.run_unitary_gate_test(truth_table, row_reduction=True)
+
+        for truth_table in [[0, 0, 0, 1], [0, 1, 1, 1], [0, 1, 1, 0]]:
+            self.run_binary_gate_test(truth_table, row_reduction=True)
+
 
 class TestExampleCircuits(TestCase):
 
-    def run_nbit_adder_test(self, lc: LogicCircuit):
-        garbler = Garbler(seed=42)
+    def run_nbit_adder_test(self, lc: LogicCircuit, row_reduction: bool = False):
+        garbler = Garbler(seed=42, row_reduction=row_reduction)
 
         n_bits = len(lc.input_ids) // 2
         # Sum of two n-bit numbers is (n-bits + 1)-bit number
@@ -111,6 +127,29 @@ class TestExampleCircuits(TestCase):
     def test_3bit_adder(self):
         self.run_nbit_adder_test(LC_ADD_3BIT)
 
+    def test_row_reduction_adders(self):
+        for lc in [LC_ADD_1BIT, LC_ADD_2BIT, LC_ADD_3BIT]:
+            self.run_nbit_adder_test(lc, row_reduction=True)
+
+    def test_row_reduction_serialization(self):
+        garbler = Garbler(seed=42, row_reduction=True)
+        lc = LogicCircuit([0, 1], [2, 3], [
+            LogicGate(2, [0, 1], [0, 0, 0, 1]),
+            LogicGate(3, [2], [1, 0]),
+        ])
+
+        gc = garbler.garble(lc, [1, 1])
+
+        # One ciphertext is omitted from every table
+        self.assertEqual([ len(g.values) for g in gc.gates ], [3, 1])
+
+        # Table shape is preserved by the serialized format
+        gc = GarbledCircuit.from_dict(json.loads(json.dumps(gc.as_dict())))
+        self.assertTrue(all(g.row_reduction for g in gc.gates))
+
+        output_bits = garbler.decrypt(gc.output_ids, gc.evaluate())
+        self.assertEqual(output_bits, [1, 0])
+
     def test_3bit_avg_test(self):
         garbler = Garbler(seed=42)
 
@@ -143,4 +182,171 @@ class TestExampleCircuits(TestCase):
             output_keys = gc.evaluate()
             output_bits = garbler.decrypt(lc.output_ids, output_keys)
             self.assertEqual(output_bits, result_bits)
-    
\ No newline at end of file
+
+
+@pytest.mark.usefixtures("evaluate_on_server")
+class TestEvaluatorServer(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = Path(self.tmp_dir.name) / "evaluator.sock"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([7], 90), 7)
+
+    def test_concurrent_sessions(self):
+        lc = LC_ADD_3BIT
+        inputs = list(gen_nbit_inputs(6))
+
+        # One garbler per client stand-in, each circuit gets its own keys
+        garblers = [ Garbler(seed=i) for i in range(len(inputs)) ]
+        circuits = [ g.garble(lc, bits) for g, bits in zip(garblers, inputs) ]
+
+        replies, stats, server = self.evaluate_on_server(circuits, workers=2, max_pending=4)
+
+        for garbler, bits, reply in zip(garblers, inputs, replies):
+            output_keys = [ bytes.fromhex(k) for k in reply["output_keys"] ]
+            output_bits = garbler.decrypt(reply["output_ids"], output_keys)
+            self.assertEqual(output_bits, lc.evaluate(bits))
+
+        self.assertEqual(stats["evaluated"], len(inputs))
+        self.assertEqual(stats["errors"], 0)
+        self.assertEqual(stats["sessions"], len(inputs) + 1)
+        self.assertEqual(set(stats["latency_ms"]), { "p50", "p90", "p99" })
+        self.assertEqual(server.stats()["evaluated"], len(inputs))
+        self.assertFalse(server.socket_path.exists())
+
+    def test_connections_over_default_backlog(self):
+        gc = Garbler(seed=42).garble(LC_ADD_3BIT, [1, 0, 1, 1, 1, 0])
+
+        # More simultaneous connections than the default asyncio listen backlog (100)
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=2, max_pending=4):
+                return await asyncio.gather(*[
+                    request(self.socket_path, EVALUATE, gc.as_dict())
+                    for _ in range(300)
+                ])
+
+        replies = asyncio.run(scenario())
+        self.assertTrue(all("output_keys" in reply for reply in replies))
+
+    def test_session_memory_cap(self):
+        gc = Garbler(seed=42).garble(LC_ADD_3BIT, [1, 0, 1, 1, 1, 0])
+
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=1, max_session_bytes=1024):
+                too_large = await request(self.socket_path, EVALUATE, gc.as_dict())
+                invalid = await request(self.socket_path, EVALUATE, { "input_ids": [] })
+                stats = await request(self.socket_path, STATS)
+            return too_large, invalid, stats
+
+        too_large, invalid, stats = asyncio.run(scenario())
+        self.assertIn("exceeds session limit", too_large["error"])
+        self.assertIn("Invalid garbled circuit", invalid["error"])
+
+        # Failed evaluations are not included in the latency percentiles
+        self.assertEqual(stats["evaluated"], 0)
+        self.assertEqual(stats["errors"], 1)
+        self.assertEqual(stats["latency_ms"], {})
+
+    def test_non_evaluate_body_refused(self):
+        body = b"x" * (1024 * 1024)
+
+        async def send_raw(kind: int):
+            reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            writer.write(HEADER.pack(kind, len(body)))
+            await writer.drain()
+
+            # Server replies without reading the body and closes the session
+            _, reply = await read_message(reader)
+            closed = await reader.read() == b""
+            writer.close()
+            return reply, closed
+
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=1, max_pending=1):
+                stats = await send_raw(STATS)
+                unknown = await send_raw(9)
+                # Server is still available for other sessions
+                reply = await request(self.socket_path, STATS)
+            return stats, unknown, reply
+
+        (stats, stats_closed), (unknown, unknown_closed), reply = asyncio.run(scenario())
+        self.assertIn("must have empty body", stats["error"])
+        self.assertIn("Unknown message type", unknown["error"])
+        self.assertTrue(stats_closed and unknown_closed)
+        self.assertEqual(reply["sessions"], 3)
+
+    def test_stalled_session(self):
+        gc = Garbler(seed=42).garble(LC_ADD_3BIT, [1, 0, 1, 1, 1, 0])
+
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=1, max_pending=1, read_timeout=0.5):
+                # Client sends only the beginning of the message and stops
+                _, stalled = await asyncio.open_unix_connection(str(self.socket_path))
+                stalled.write(HEADER.pack(EVALUATE, 100) + b"{")
+                await stalled.drain()
+                await asyncio.sleep(0.1)
+
+                # Stats do not wait for the evaluation slot held by the stalled client
+                stats = await asyncio.wait_for(request(self.socket_path, STATS), 0.3)
+
+                # Slot is released after the read timeout
+                reply = await asyncio.wait_for(request(self.socket_path, EVALUATE, gc.as_dict()), 2)
+
+                stalled.close()
+            return stats, reply
+
+        stats, reply = asyncio.run(scenario())
+        self.assertEqual(stats["evaluated"], 0)
+        self.assertEqual(len(reply["output_keys"]), len(gc.output_ids))
+
+    def test_broken_worker_pool(self):
+        gc = Garbler(seed=42).garble(LC_ADD_3BIT, [1, 0, 1, 1, 1, 0])
+
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=1) as server:
+                # Simulate the worker killed by the system
+                loop = asyncio.get_running_loop()
+                broken = server._executor
+                with self.assertRaises(BrokenProcessPool):
+                    await loop.run_in_executor(broken, os._exit, 1)
+
+                # Job submitted after the crash never ran in the dead worker,
+                # it is retried on the fresh pool
+                reply = await request(self.socket_path, EVALUATE, gc.as_dict())
+                stats = await request(self.socket_path, STATS)
+                self.assertIsNot(server._executor, broken)
+            return reply, stats
+
+        reply, stats = asyncio.run(scenario())
+        self.assertEqual(len(reply["output_keys"]), len(gc.output_ids))
+        self.assertEqual(stats["errors"], 0)
+
+    def test_worker_crash_during_evaluation(self):
+        gc = Garbler(seed=42).garble(LC_ADD_3BIT, [1, 0, 1, 1, 1, 0])
+
+        async def scenario():
+            async with EvaluatorServer(self.socket_path, workers=1) as server:
+                # Replace the job with one killing the worker while it is running
+                def submit_crash(data: bytes):
+                    executor = server._executor
+                    return executor, asyncio.get_running_loop().run_in_executor(executor, os._exit, 1)
+
+                server._submit = submit_crash
+                failed = await request(self.socket_path, EVALUATE, gc.as_dict())
+                del server._submit
+
+                reply = await request(self.socket_path, EVALUATE, gc.as_dict())
+            return failed, reply
+
+        failed, reply = asyncio.run(scenario())
+        self.assertIn("Worker process terminated", failed["error"])
+        self.assertEqual(len(reply["output_keys"]), len(gc.output_ids))
@@ -0,0 +1,135 @@
+import json
+import os
+import random
+from unittest import TestCase
+
+import pytest
+
+from yaosfe.garbler import Garbler
+from yaosfe.circuits import LogicCircuit, GarbledCircuit
+from yaosfe.examples import LC_ADD_3BIT, LC_AVG_3BIT, random_logic_circuit
+from yaosfe.util import gen_nbit_inputs
+
+# Multiplier for the size of generated circuits, e.g. YAOSFE_TEST_SCALE=10 for long runs
+SCALE = int(os.environ.get("YAOSFE_TEST_SCALE", "1"))
+
+# Configurations of the random circuits: (n_inputs, n_gates, n_outputs, gate_mix)
+CONFIGS = [
+    (4, 16, 4, None),
+    (16, 128 * SCALE, 8, None),
+    (32, 256 * SCALE, 16, { "AND": 3, "XOR": 1 }),
+    (8, 64 * SCALE, 8, { "XOR": 2, "NOT": 1 }),
+]
+
+# Garbling modes, every one must agree with the plaintext evaluation
+GARBLER_MODES = [
+    { "row_reduction": False },
+    { "row_reduction": True },
+]
+
+SEEDS = [0, 1, 2]
+SAMPLES = 8
+
+
+def random_inputs(lc: LogicCircuit, n: int, seed) -> list[list[int]]:
+    rng = random.Random(seed)
+    return [ [ rng.getrandbits(1) for _ in lc.input_ids ] for _ in range(n) ]
+
+
+def garble_matrix() -> list[tuple[dict, Garbler, GarbledCircuit, list[int]]]:
+    """Garble SAMPLES inputs of every random circuit (SEEDS x CONFIGS) in every mode
+
+    Returns (case description, garbler, garbled circuit, expected output bits),
+    each circuit has its own garbler, so its keys are kept for the decryption.
+    """
+
+    cases = []
+    for seed in SEEDS:
+        for n_inputs, n_gates, n_outputs, gate_mix in CONFIGS:
+            lc = random_logic_circuit(n_inputs, n_gates, n_outputs, gate_mix, seed)
+            input_batch = random_inputs(lc, SAMPLES, seed)
+            expected = lc.evaluate_batch(input_batch)
+
+            for mode in GARBLER_MODES:
+                for k, (bits, expected_bits) in enumerate(zip(input_batch, expected)):
+                    garbler = Garbler(seed=seed * SAMPLES + k, **mode)
+                    case = { "seed": seed, "n_gates": n_gates, "mode": mode, "sample": k }
+                    cases.append((case, garbler, garbler.garble(lc, bits), expected_bits))
+
+    return cases
+
+
+class TestBatchEvaluation(TestCase):
+
+    def test_batch_matches_examples(self):
+        for lc in [LC_ADD_3BIT, LC_AVG_3BIT]:
+            input_batch = list(gen_nbit_inputs(len(lc.input_ids)))
+            expected = [ lc.evaluate(bits) for bits in input_batch ]
+            self.assertEqual(lc.evaluate_batch(input_batch), expected)
+
+    def test_batch_matches_random_circuits(self):
+        for seed in SEEDS:
+            for n_inputs, n_gates, n_outputs, gate_mix in CONFIGS:
+                lc = random_logic_circuit(n_inputs, n_gates, n_outputs, gate_mix, seed)
+                input_batch = random_inputs(lc, 64, seed)
+                expected = [ lc.evaluate(bits) for bits in input_batch ]
+                self.assertEqual(lc.evaluate_batch(input_batch), expected)
+
+    def test_large_circuit_batch(self):
+        # Exhaustive batch over all 12-bit inputs for a deep circuit
+        lc = random_logic_circuit(12, 2048 * SCALE, 16, { "XOR": 1 }, seed=42)
+        input_batch = list(gen_nbit_inputs(12))
+        outputs = lc.evaluate_batch(input_batch)
+        self.assertEqual(len(outputs), 1 << 12)
+
+        # Spot check against gate-by-gate evaluation
+        for k in range(0, 1 << 12, 257):
+            self.assertEqual(outputs[k], lc.evaluate(input_batch[k]))
+
+    def test_random_circuit_is_deterministic(self):
+        lc1 = random_logic_circuit(8, 64, 4, seed=7)
+        lc2 = random_logic_circuit(8, 64, 4, seed=7)
+        self.assertEqual(lc1.as_dict(), lc2.as_dict())
+
+    def test_random_circuit_unknown_gate(self):
+        with self.assertRaises(ValueError):
+            random_logic_circuit(8, 64, 4, { "NAND": 1 }, seed=7)
+
+
+@pytest.mark.usefixtures("evaluate_on_server")
+class TestDifferentialGarbling(TestCase):
+
+    def test_modes_agree_with_plaintext(self):
+        for case, garbler, gc, expected_bits in garble_matrix():
+            with self.subTest(**case):
+                # Round-trip through the serialized format before evaluating
+                gc = GarbledCircuit.from_dict(json.loads(json.dumps(gc.as_dict())))
+                output_bits = garbler.decrypt(gc.output_ids, gc.evaluate())
+                self.assertEqual(output_bits, expected_bits)
+
+    def test_garbling_is_deterministic(self):
+        lc = random_logic_circuit(16, 128, 8, seed=3)
+        bits = random_inputs(lc, 1, seed=3)[0]
+
+        for mode in GARBLER_MODES:
+            gc1 = Garbler(seed=3, **mode).garble(lc, bits)
+            gc2 = Garbler(seed=3, **mode).garble(lc, bits)
+            self.assertEqual(gc1.as_dict(), gc2.as_dict())
+
+    def test_sequential_and_parallel_identical(self):
+        # There is no parallel garbling mode yet, circuits are garbled sequentially
+        # and only their evaluation is compared: in-process vs the process pool
+        cases = garble_matrix()
+
+        # Whole matrix is evaluated by the server at once
+        replies, stats, _ = self.evaluate_on_server([ gc for _, _, gc, _ in cases ], workers=2, max_pending=4)
+        self.assertEqual(stats["evaluated"], len(cases))
+
+        for (case, garbler, gc, expected_bits), reply in zip(cases, replies):
+            with self.subTest(**case):
+                sequential = [ key.hex() for key in gc.evaluate() ]
+                self.assertEqual(reply["output_keys"], sequential)
+
+                output_keys = [ bytes.fromhex(k) for k in reply["output_keys"] ]
+                output_bits = garbler.decrypt(reply["output_ids"], output_keys)
+                self.assertEqual(output_bits, expected_bits)